@@ -1,6 +1,12 @@
+import asyncio
 import json
-from typing import List
+import logging
+from functools import lru_cache
+from types import MappingProxyType
+from typing import List, Mapping, Tuple
 from autogen_core import (
+    CancellationToken,
+    FunctionCall,
     MessageContext,
     RoutedAgent,
     TopicId,
@@ -9,15 +15,43 @@ from autogen_core import (
 from autogen_core.models import (
     AssistantMessage,
     ChatCompletionClient,
+    CreateResult,
     FunctionExecutionResult,
     FunctionExecutionResultMessage,
     SystemMessage,
     LLMMessage,
 )
-from autogen_core.tools import Tool
+from autogen_core.tools import Tool, ToolSchema
 from context.session_manager import SessionManager
 from models.messages import Session
 
+try:
+    # orjson parses tool-call arguments noticeably faster when it is installed
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+_TOOL_ERROR = "Error: {}"
+
+
+@lru_cache(maxsize=None)
+def _compile_tools(
+    tools: Tuple[Tool, ...], delegate_tools: Tuple[Tool, ...]
+) -> Tuple[
+    Mapping[str, Tuple[str, Tool]], Tuple[Tool, ...], Tuple[ToolSchema, ...]
+]:
+    """Build the dispatch table, name-ordered tools and schemas once per tool set."""
+    # Single lookup per call resolves both the tool and whether it delegates
+    dispatch = MappingProxyType(
+        {tool.name: ("tool", tool) for tool in tools}
+        | {tool.name: ("delegate", tool) for tool in delegate_tools}
+    )
+    # Stable tool order keeps the serialized request prefix identical across turns
+    ordered = tuple(sorted((*tools, *delegate_tools), key=lambda tool: tool.name))
+    return dispatch, ordered, tuple(tool.schema for tool in ordered)
+
 
 class AIAgent(RoutedAgent):
     def __init__(
@@ -36,89 +70,147 @@ class AIAgent(RoutedAgent):
         self._model_client = model_client
         self.tools = tools
         self.delegate_tools = delegate_tools
-        self._tools_dict = dict([(tool.name, tool) for tool in tools])
-        self._delegate_tools_dict = dict([(tool.name, tool) for tool in delegate_tools])
+        # Agents are instantiated per session, so share the compiled tool set
+        self._dispatch, self._all_tools, self._tool_schemas = _compile_tools(
+            tuple(tools), tuple(delegate_tools)
+        )
         self._agent_topic_type = agent_topic_type
         self._user_topic_type = user_topic_type
         self._session_manager = sessionManager
 
     @message_handler
     async def handle_task(self, message: Session, ctx: MessageContext) -> None:
-        print(f"{'-' * 80}\nHandling Task by: {self.id.type}\n", flush=True)
+        logger.debug("Handling task by: %s", self.id.type)
         llm_result = await self._get_llm_response(
-            message.get_context_as_llm_messages(), ctx.cancellation_token
+            message.get_context_as_llm_messages(), message.id, ctx.cancellation_token
         )
         message.add_message(
             AssistantMessage(content=llm_result.content, source=self.id.type)
         )
-        print(f"\nLLM Result:\n{llm_result}\n", flush=True)
+        logger.debug("LLM result: %s", llm_result)
 
         # keep running until we get a non-function call response
-        while llm_result.finish_reason == "function_calls":
-            function_call = llm_result.content[0]
-
-            if function_call.name in self._tools_dict:
-                print(f"Function call: {function_call.name} with arguments: {function_call.arguments}", flush=True)
-                tool_object = self._tools_dict.get(function_call.name)
-                result = await tool_object.run_json(
-                    json.loads(function_call.arguments), ctx.cancellation_token
-                )
-                tool_call_results = tool_object.return_value_as_string(result)
-                tool_execution_result = FunctionExecutionResult(
-                    call_id=function_call.id,
-                    name=function_call.name,
-                    content=tool_call_results,
-                    is_error=False,
-                )
-                print(f"Tool call results: {tool_call_results}", flush=True)
-                message.add_message(
-                    FunctionExecutionResultMessage(content=[tool_execution_result])
-                )
-                llm_result = await self._get_llm_response(
-                    message.get_context_as_llm_messages(), ctx.cancellation_token
-                )
-                message.add_message(
-                    AssistantMessage(content=llm_result.content, source=self.id.type)
-                )
-                print(
-                    f"LLM Result after function execution:\n{llm_result}\n", flush=True
-                )
+        while self._has_function_calls(llm_result):
+            function_calls = llm_result.content
+            call_kinds = []
+            call_tools = []
+            for function_call in function_calls:
+                kind_tool = self._dispatch.get(function_call.name)
+                if kind_tool is None:
+                    raise ValueError(f"Unknown tool: {function_call.name}")
+                kind, tool_object = kind_tool
+                call_kinds.append(kind)
+                call_tools.append(tool_object)
 
-            elif function_call.name in self._delegate_tools_dict:
-                print(f"Delegate tool call: {function_call.name}", flush=True)
-                tool_object = self._delegate_tools_dict.get(function_call.name)
-                result = await tool_object.run_json(
-                    json.loads(function_call.arguments), ctx.cancellation_token
-                )
-                # Assuming the tool returns a string indicating the target topic
-                tool_call_results = tool_object.return_value_as_string(result)
-                tool_execution_result = FunctionExecutionResult(
-                    call_id=function_call.id,
-                    name=function_call.name,
-                    content=f"Transferred to {tool_call_results}. Adopt persona immediately.",
-                    is_error=False,
-                )
+            # Independent tool calls run concurrently; gather keeps results in call order
+            tool_execution_results = await asyncio.gather(
+                *[
+                    self._execute_tool(tool_object, function_call, ctx.cancellation_token)
+                    for tool_object, function_call in zip(call_tools, function_calls)
+                ]
+            )
+
+            delegate_targets = [
+                result.content
+                for kind, result in zip(call_kinds, tool_execution_results)
+                if kind == "delegate" and not result.is_error
+            ]
+            if delegate_targets:
+                # Assuming the delegate tool returns a string indicating the target topic
+                target_topic = delegate_targets[0]
                 message.add_message(
-                    FunctionExecutionResultMessage(content=[tool_execution_result])
+                    FunctionExecutionResultMessage(
+                        content=[
+                            result.model_copy(
+                                update={
+                                    "content": f"Transferred to {result.content}. Adopt persona immediately."
+                                }
+                            )
+                            if kind == "delegate" and not result.is_error
+                            else result
+                            for kind, result in zip(call_kinds, tool_execution_results)
+                        ]
+                    )
                 )
                 await self.publish_message(
-                    message, topic_id=TopicId(tool_call_results, source=self.id.key)
+                    message, topic_id=TopicId(target_topic, source=self.id.key)
                 )
-                print(f"Delegated to: {tool_call_results}\n{'-' * 80}\n", flush=True)
+                logger.debug("Delegated to: %s", target_topic)
                 return  # Task fully delegated, we're done
-            else:
-                raise ValueError(f"Unknown tool: {function_call.name}")
+
+            message.add_message(
+                FunctionExecutionResultMessage(content=list(tool_execution_results))
+            )
+            llm_result = await self._get_llm_response(
+                message.get_context_as_llm_messages(),
+                message.id,
+                ctx.cancellation_token,
+            )
+            message.add_message(
+                AssistantMessage(content=llm_result.content, source=self.id.type)
+            )
+            logger.debug("LLM result after function execution: %s", llm_result)
 
         message.current_agent = self.id.type
         message.status = "completed"
-        self._session_manager._update_session(message)
-        print(f"Task completed by {self.id.type}", flush=True)
+        await self._session_manager._update_session(message)
+        logger.debug("Task completed by %s", self.id.type)
+
+    @staticmethod
+    def _has_function_calls(result: CreateResult) -> bool:
+        """Check whether the response requests tool calls."""
+        # Response content is either text or a homogeneous list of calls
+        content = result.content
+        return (
+            isinstance(content, list)
+            and len(content) > 0
+            and isinstance(content[0], FunctionCall)
+        )
+
+    async def _execute_tool(
+        self,
+        tool_object: Tool,
+        function_call: FunctionCall,
+        cancellation_token: CancellationToken,
+    ) -> FunctionExecutionResult:
+        """Run a single tool or delegate tool call and wrap its result."""
+        logger.debug(
+            "Function call: %s with arguments: %s",
+            function_call.name,
+            function_call.arguments,
+        )
+        try:
+            result = await tool_object.run_json(
+                json_loads(function_call.arguments), cancellation_token
+            )
+        except Exception as e:
+            # Report the failure to the LLM instead of aborting the whole task
+            logger.exception("Tool %s failed", function_call.name)
+            return FunctionExecutionResult(
+                call_id=function_call.id,
+                name=function_call.name,
+                content=_TOOL_ERROR.format(e),
+                is_error=True,
+            )
+        tool_call_results = tool_object.return_value_as_string(result)
+        logger.debug("Tool call results: %s", tool_call_results)
+        return FunctionExecutionResult(
+            call_id=function_call.id,
+            name=function_call.name,
+            content=tool_call_results,
+            is_error=False,
+        )
 
-    async def _get_llm_response(self, messages: List[LLMMessage], cancellation_token):
+    async def _get_llm_response(
+        self, messages: List[LLMMessage], session_id: str, cancellation_token
+    ):
         """Get response from LLM with appropriate context and tools."""
         result = await self._model_client.create(
             messages=[self._system_message] + messages,
-            tools=self.tools + self.delegate_tools,
+            tools=self._tool_schemas,
+            # Keying requests by session lets the provider route a conversation's
+            # turns to the prompt cache that already holds its prefix
+            extra_create_args={"user": session_id},
             cancellation_token=cancellation_token,
         )
         return result
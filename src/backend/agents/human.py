@@ -1,4 +1,5 @@
 from autogen_core import RoutedAgent, message_handler, MessageContext
+from context.human_input import HumanInputBroker
 from context.session_manager import SessionManager
 from models.messages import Session
 from autogen_core.models import AssistantMessage
@@ -11,19 +12,20 @@ class HumanAgent(RoutedAgent):
         agent_topic_type: str,
         user_topic_type: str,
         sessionManager: SessionManager,
+        humanInputBroker: HumanInputBroker,
     ) -> None:
         super().__init__(description)
         self._agent_topic_type = agent_topic_type
         self._user_topic_type = user_topic_type
         self._session_manager = sessionManager
+        self._human_input = humanInputBroker
 
     @message_handler
     async def handle_message(self, message: Session, ctx: MessageContext) -> None:
-        # TODO: Implement a proper user interface for human agent
-        message.status = "processing"
-        self._session_manager._update_session(message)
-        agent_input = input("Human agent: ")
+        # /chat already stored the session as "processing", so the only write
+        # needed is after the reply arrives via POST /sessions/{id}/human-reply
+        agent_input = await self._human_input.wait_for_reply(message.id)
         message.add_message(AssistantMessage(content=agent_input, source=self.id.type))
         message.current_agent = self.id.type
         message.status = "completed"
-        self._session_manager._update_session(message)
+        await self._session_manager._update_session(message)
@@ -1,10 +1,52 @@
-from typing import Dict, Any, List, Annotated
-from datetime import datetime
+import json
+from typing import Dict, Any, List, Annotated, Optional
+from datetime import datetime, timedelta
+from itertools import count
 from autogen_core.models import SystemMessage, ChatCompletionClient
 from autogen_core.tools import FunctionTool
 
 from context.session_manager import SessionManager
 from .ai import AIAgent
+from .line_items import line_items_total
+
+
+# Kept at module scope so every call sends a byte-identical prompt prefix
+_SYSTEM_MESSAGE = SystemMessage(
+    content="""You are an Invoice agent and can help users with the following tasks:
+               - Finding information about their existing invoices
+               - Creating new invoices
+               - Creating invoices from purchase order details
+               - Summarizing unpaid totals and listing overdue invoices
+               - Return current date and time
+            
+            When creating an invoice from a purchase order, you should:
+            1. Try to get all the necessary details from the context if possible and ask the user for any missing details
+            2. Ask the user for the purchase order ID if not provided
+            3. Ask for supplier details if they aren't clear from the context
+            4. ALWAYS include line items in the invoice with their name, quantity, and price
+            5. Create the invoice and confirm with the user
+            
+            When calling the create_invoice_from_po_details function, ALWAYS include the items parameter
+            with an array of items that includes name, quantity, and price for each item.
+            
+            Example items format:
+            "items": [
+                {"name": "Deluxe Package", "quantity": 1, "price": 199.99},
+                {"name": "Support Plan", "quantity": 1, "price": 49.99}
+            ]
+            
+            Always confirm the invoice creation with the user before finalizing it.
+
+            IMPORTANT: For any queries unrelated to invoices, ALWAYS use the 'transfer_to_orchestrator' function with a brief reason. 
+            Examples when to transfer:
+            - General financial questions
+            - Questions about purchases
+            - User asks about other financial documents
+            - User wants to exit invoice context
+            
+            Be sure to notice when the user's request is not related to invoices and use transfer_to_orchestrator in these cases.
+            """
+)
 
 
 class InvoiceAgent(AIAgent):
@@ -16,61 +58,13 @@ class InvoiceAgent(AIAgent):
         sessionManager: SessionManager,
     ) -> None:
         description = "An agent handles invoice related tasks"
-        system_message = SystemMessage(
-            content="""You are an Invoice agent and can help users with the following tasks:
-                       - Finding information about their existing invoices
-                       - Creating new invoices
-                       - Creating invoices from purchase order details
-                       - Return current date and time
-                    
-                    When creating an invoice from a purchase order, you should:
-                    1. Try to get all the necessary details from the context if possible and ask the user for any missing details
-                    2. Ask the user for the purchase order ID if not provided
-                    3. Ask for supplier details if they aren't clear from the context
-                    4. ALWAYS include line items in the invoice with their name, quantity, and price
-                    5. Create the invoice and confirm with the user
-                    
-                    When calling the create_invoice_from_po_details function, ALWAYS include the items parameter
-                    with an array of items that includes name, quantity, and price for each item.
-                    
-                    Example items format:
-                    "items": [
-                        {"name": "Deluxe Package", "quantity": 1, "price": 199.99},
-                        {"name": "Support Plan", "quantity": 1, "price": 49.99}
-                    ]
-                    
-                    Always confirm the invoice creation with the user before finalizing it.
-
-                    IMPORTANT: For any queries unrelated to invoices, ALWAYS use the 'transfer_to_orchestrator' function with a brief reason. 
-                    Examples when to transfer:
-                    - General financial questions
-                    - Questions about purchases
-                    - User asks about other financial documents
-                    - User wants to exit invoice context
-                    
-                    Be sure to notice when the user's request is not related to invoices and use transfer_to_orchestrator in these cases.
-                    """
-        )
-        # agent's tools
-        tools = [
-            fetch_invoice_tool,
-            fetch_invoices_tool,
-            create_invoice_tool,
-            create_invoice_from_po_details_tool,
-        ]
-
-        # Define delegation tools
-        delegate_tools = [
-            transfer_to_orchestrator_tool,
-        ]
-
         # Initialize the base AIAgent with these specifications
         super().__init__(
             description=description,
-            system_message=system_message,
+            system_message=_SYSTEM_MESSAGE,
             model_client=model_client,
-            tools=tools,
-            delegate_tools=delegate_tools,
+            tools=_TOOLS,
+            delegate_tools=_DELEGATE_TOOLS,
             agent_topic_type=agent_topic_type,
             user_topic_type=user_topic_type,
             sessionManager=sessionManager,
@@ -86,9 +80,12 @@ async def fetch_invoice(
     return {"error": f"Invoice {invoice_id} not found"}
 
 
-async def fetch_invoices() -> Dict[str, Any]:
+async def fetch_invoices() -> str:
     """Fetch all invoices for a given user"""
-    return INVOICE_DATABASE
+    global _INVOICES_JSON_CACHE
+    if _INVOICES_JSON_CACHE is None:
+        _INVOICES_JSON_CACHE = json.dumps(INVOICE_DATABASE)
+    return _INVOICES_JSON_CACHE
 
 
 async def create_invoice(
@@ -97,17 +94,17 @@ async def create_invoice(
     items: Annotated[List[Dict[str, Any]], "List of items to include in the invoice"],
 ) -> Dict[str, Any]:
     """Create a new invoice for a customer"""
+    global _INVOICES_JSON_CACHE
     # Generate invoice ID
-    invoice_id = f"INV-{len(INVOICE_DATABASE) + 1:03d}"
+    invoice_id = f"INV-{next(_INVOICE_NUMBERS):03d}"
 
     # Calculate total
-    total = sum(item["quantity"] * item["price"] for item in items)
+    total = line_items_total(items)
 
     # Current date and due date (30 days later)
-    today = datetime.now().strftime("%Y-%m-%d")
-    due_date = (
-        datetime.now().replace(month=datetime.now().month + 1).strftime("%Y-%m-%d")
-    )
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    due_date = (now + timedelta(days=30)).strftime("%Y-%m-%d")
 
     # Create invoice
     invoice = {
@@ -123,6 +120,7 @@ async def create_invoice(
 
     # Add to database
     INVOICE_DATABASE[invoice_id] = invoice
+    _INVOICES_JSON_CACHE = None
 
     return {"success": True, "invoice": invoice}
 
@@ -134,17 +132,17 @@ async def create_invoice_from_po_details(
     items: Annotated[List[Dict[str, Any]], "List of items from the purchase order to include in the invoice"],
 ) -> Dict[str, Any]:
     """Create a new invoice based on purchase order details provided in the context or by the user"""
+    global _INVOICES_JSON_CACHE
     # Generate invoice ID
-    invoice_id = f"INV-{len(INVOICE_DATABASE) + 1:03d}"
+    invoice_id = f"INV-{next(_INVOICE_NUMBERS):03d}"
 
     # Calculate total from items
-    total = sum(item["quantity"] * item["price"] for item in items)
+    total = line_items_total(items)
 
     # Current date and due date (30 days later)
-    today = datetime.now().strftime("%Y-%m-%d")
-    due_date = (
-        datetime.now().replace(month=datetime.now().month + 1).strftime("%Y-%m-%d")
-    )
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    due_date = (now + timedelta(days=30)).strftime("%Y-%m-%d")
 
     # Create invoice
     invoice = {
@@ -161,6 +159,7 @@ async def create_invoice_from_po_details(
 
     # Add to database
     INVOICE_DATABASE[invoice_id] = invoice
+    _INVOICES_JSON_CACHE = None
 
     return {
         "success": True,
@@ -169,6 +168,35 @@ async def create_invoice_from_po_details(
     }
 
 
+async def sum_unpaid_total() -> Dict[str, Any]:
+    """Sum the totals of all unpaid invoices"""
+    unpaid_totals = [
+        invoice["total"]
+        for invoice in INVOICE_DATABASE.values()
+        if invoice["status"] == "unpaid"
+    ]
+    return {"unpaid_invoices": len(unpaid_totals), "total": round(sum(unpaid_totals), 2)}
+
+
+async def list_overdue_invoices() -> Dict[str, Any]:
+    """List unpaid invoices whose due date has passed"""
+    # Dates are stored as YYYY-MM-DD, so string comparison orders them correctly
+    today = datetime.now().strftime("%Y-%m-%d")
+    overdue = [
+        {
+            "id": invoice["id"],
+            "supplier_name": invoice["supplier_name"],
+            "due_date": invoice["due_date"],
+            "total": invoice["total"],
+        }
+        for invoice in INVOICE_DATABASE.values()
+        if invoice["status"] == "unpaid" and invoice["due_date"] < today
+    ]
+    if overdue:
+        return {"overdue_invoices": overdue}
+    return {"message": "No overdue invoices found"}
+
+
 async def transfer_to_orchestrator(
     reason: Annotated[str, "Reason for transferring back to orchestrator"],
 ) -> str:
@@ -191,11 +219,31 @@ create_invoice_from_po_details_tool = FunctionTool(
     create_invoice_from_po_details,
     description="Create a new invoice based on purchase order details provided by the user or in context",
 )
+sum_unpaid_total_tool = FunctionTool(
+    sum_unpaid_total, description="Sum the totals of all unpaid invoices"
+)
+list_overdue_invoices_tool = FunctionTool(
+    list_overdue_invoices, description="List unpaid invoices whose due date has passed"
+)
 transfer_to_orchestrator_tool = FunctionTool(
     transfer_to_orchestrator,
     description="Transfer the conversation to the orchestrator agent when user needs help with tasks unrelated to invoices",
 )
 
+# Tool lists shared by every InvoiceAgent instance
+_TOOLS = [
+    fetch_invoice_tool,
+    fetch_invoices_tool,
+    create_invoice_tool,
+    create_invoice_from_po_details_tool,
+    sum_unpaid_total_tool,
+    list_overdue_invoices_tool,
+]
+
+_DELEGATE_TOOLS = [
+    transfer_to_orchestrator_tool,
+]
+
 # Mock invoice data
 INVOICE_DATABASE = {
     "INV-001": {
@@ -227,3 +275,9 @@ INVOICE_DATABASE = {
         "status": "unpaid",
     },
 }
+
+# Serialized INVOICE_DATABASE served by fetch_invoices, reset whenever an invoice is added
+_INVOICES_JSON_CACHE: Optional[str] = None
+
+# Invoice number sequence; next() is atomic, unlike reading len(INVOICE_DATABASE)
+_INVOICE_NUMBERS = count(len(INVOICE_DATABASE) + 1)
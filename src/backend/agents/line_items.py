@@ -0,0 +1,12 @@
+import math
+from operator import itemgetter
+from typing import Any, Dict, List
+
+_quantity = itemgetter("quantity")
+_price = itemgetter("price")
+
+
+def line_items_total(items: List[Dict[str, Any]]) -> float:
+    """Sum quantity * price over a list of line items"""
+    # sumprod runs the multiply-accumulate loop in C (Python 3.12+)
+    return math.sumprod(map(_quantity, items), map(_price, items))
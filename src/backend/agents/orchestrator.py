@@ -6,6 +6,33 @@ from context.session_manager import SessionManager
 from .ai import AIAgent
 
 
+# Kept at module scope so every call sends a byte-identical prompt prefix
+_SYSTEM_MESSAGE = SystemMessage(
+    content="""You are an Orchestrator agent.
+            Your job is to understand what the user needs and direct them to the appropriate agent:
+
+            - For invoice-related queries (viewing, creating, managing invoices, billing questions),
+            transfer the user to invoice agent. If purchase order not given, ask the purchase order agent for PO details.
+            
+            - For purchase order queries (creating POs, checking PO status, modifying POs), 
+            transfer the user to purchase order agent.
+            
+            - For complex issues that require human expertise or when the user explicitly 
+            asks to speak to a human, transfer the user to human agent.
+
+            Ask natural, conversational questions to determine where to route the user. 
+            Be brief but helpful in your responses. Don't make the user feel like they're 
+            talking to a robot.
+
+            Example questions to determine user needs:
+            - "Are you inquiring about an invoice or a purchase order today?"
+            - "Would you like help with creating a new purchase order or checking an existing one?"
+
+            Once you understand their needs, transfer them to the appropriate agent.
+            """
+)
+
+
 class OrchestratorAgent(AIAgent):
     """Agent that orchestrates workflows and routes users to specialized agents."""
 
@@ -19,46 +46,14 @@ class OrchestratorAgent(AIAgent):
         description = (
             "An orchestrator agent that directs users to the appropriate department"
         )
-        # Define the agent's system message
-        system_message = SystemMessage(
-            content="""You are an Orchestrator agent.
-                    Your job is to understand what the user needs and direct them to the appropriate agent:
-
-                    - For invoice-related queries (viewing, creating, managing invoices, billing questions),
-                    transfer the user to invoice agent. If purchase order not given, ask the purchase order agent for PO details.
-                    
-                    - For purchase order queries (creating POs, checking PO status, modifying POs), 
-                    transfer the user to purchase order agent.
-                    
-                    - For complex issues that require human expertise or when the user explicitly 
-                    asks to speak to a human, transfer the user to human agent.
-
-                    Ask natural, conversational questions to determine where to route the user. 
-                    Be brief but helpful in your responses. Don't make the user feel like they're 
-                    talking to a robot.
-
-                    Example questions to determine user needs:
-                    - "Are you inquiring about an invoice or a purchase order today?"
-                    - "Would you like help with creating a new purchase order or checking an existing one?"
-
-                    Once you understand their needs, transfer them to the appropriate agent.
-                    """
-        )
-
-        # Define delegation tools
-        delegate_tools = [
-            transfer_to_invoice_agent_tool,
-            transfer_to_po_agent_tool,
-            escalate_to_human_tool,
-        ]
 
         # Initialize the base AIAgent with these specifications
         super().__init__(
             description=description,
-            system_message=system_message,
+            system_message=_SYSTEM_MESSAGE,
             model_client=model_client,
             tools=[],
-            delegate_tools=delegate_tools,
+            delegate_tools=_DELEGATE_TOOLS,
             agent_topic_type=agent_topic_type,
             user_topic_type=user_topic_type,
             sessionManager=sessionManager,
@@ -101,3 +96,10 @@ escalate_to_human_tool = FunctionTool(
     escalate_to_human,
     description="Escalate the user to a human agent for complex issues",
 )
+
+# Delegation tools shared by every OrchestratorAgent instance
+_DELEGATE_TOOLS = [
+    transfer_to_invoice_agent_tool,
+    transfer_to_po_agent_tool,
+    escalate_to_human_tool,
+]
@@ -1,10 +1,32 @@
-from typing import Dict, Any, List, Annotated
-from datetime import datetime
+from collections import defaultdict
+from typing import Dict, Any, List, Annotated, DefaultDict, Optional
+from datetime import date
 from autogen_core.models import SystemMessage, ChatCompletionClient
 from autogen_core.tools import FunctionTool
 
 from context.session_manager import SessionManager
 from .ai import AIAgent
+from .line_items import line_items_total
+
+
+_SYSTEM_MESSAGE = SystemMessage(
+    content="""You are a Purchase Order agent. You can help users with:
+               - Finding information about their existing purchase orders
+               - Creating new purchase orders
+               - Checking the status of purchase orders (open or closed)
+               - Generating invoices for open purchase orders (by delegating to the invoice agent)
+
+            Respond concisely but professionally. Always assist users with PO-related queries
+            efficiently. Ask for specific details like PO ID when needed to provide accurate information.
+
+            When a users wants to create an invoice for an open purchase order, transfer them to the invoice agent
+            and provide the PO ID and its details to the invoice agent to create the invoice.
+            
+            For issues unrelated to purchase orders, transfer the user back to the orchestrator agent.
+
+            Always present purchase order data in a clear, readable format when showing it to users.
+            """
+)
 
 
 class PurchaseOrderAgent(AIAgent):
@@ -18,47 +40,14 @@ class PurchaseOrderAgent(AIAgent):
         sessionManager: SessionManager
     ) -> None:
         description = "An agent that handles purchase order related tasks"
-        system_message = SystemMessage(
-            content="""You are a Purchase Order agent. You can help users with:
-                       - Finding information about their existing purchase orders
-                       - Creating new purchase orders
-                       - Checking the status of purchase orders (open or closed)
-                       - Generating invoices for open purchase orders (by delegating to the invoice agent)
-
-                    Respond concisely but professionally. Always assist users with PO-related queries
-                    efficiently. Ask for specific details like PO ID when needed to provide accurate information.
-
-                    When a users wants to create an invoice for an open purchase order, transfer them to the invoice agent
-                    and provide the PO ID and its details to the invoice agent to create the invoice.
-                    
-                    For issues unrelated to purchase orders, transfer the user back to the orchestrator agent.
-
-                    Always present purchase order data in a clear, readable format when showing it to users.
-                    """
-        )
-
-        # Define agent-specific tools
-        tools = [
-            fetch_po_tool,
-            fetch_user_pos_tool,
-            fetch_open_pos_tool,
-            create_po_tool,
-            close_po_tool,
-        ]
-
-        # Define delegation tools
-        delegate_tools = [
-            transfer_to_invoice_agent_tool,
-            transfer_back_to_orchestrator_tool,
-        ]
 
         # Initialize the base AIAgent with these specifications
         super().__init__(
             description=description,
-            system_message=system_message,
+            system_message=_SYSTEM_MESSAGE,
             model_client=model_client,
-            tools=tools,
-            delegate_tools=delegate_tools,
+            tools=_TOOLS,
+            delegate_tools=_DELEGATE_TOOLS,
             agent_topic_type=agent_topic_type,
             user_topic_type=user_topic_type,
             sessionManager=sessionManager,
@@ -70,8 +59,9 @@ async def fetch_po(
     po_id: Annotated[str, "ID of the purchase order to fetch"],
 ) -> Dict[str, Any]:
     """Fetch details of a purchase order by its ID"""
-    if po_id in PO_DATABASE:
-        return PO_DATABASE[po_id]
+    po = PO_REPOSITORY.by_id(po_id)
+    if po is not None:
+        return po
     return {"error": f"Purchase Order {po_id} not found"}
 
 
@@ -79,10 +69,7 @@ async def fetch_user_pos(
     supplier_id: Annotated[str, "ID of the user to fetch purchase orders for"],
 ) -> Dict[str, Any]:
     """Fetch all purchase orders for a given user"""
-    pos = []
-    for po_id, po in PO_DATABASE.items():
-        if po["supplier_id"] == supplier_id:
-            pos.append(po)
+    pos = PO_REPOSITORY.by_supplier(supplier_id)
 
     if pos:
         return {"purchase_orders": pos}
@@ -91,16 +78,24 @@ async def fetch_user_pos(
 
 async def fetch_open_pos() -> Dict[str, Any]:
     """Fetch all open purchase orders"""
-    open_pos = []
-    for po_id, po in PO_DATABASE.items():
-        if po["status"] == "open":
-            open_pos.append(po)
+    open_pos = PO_REPOSITORY.open()
 
     if open_pos:
         return {"open_purchase_orders": open_pos}
     return {"message": "No open purchase orders found"}
 
 
+# Formatted date string for the current day, refreshed when the day changes
+_today_cache: Dict[str, Any] = {"day": None, "str": None}
+
+
+def _today_str() -> str:
+    today = date.today()
+    if _today_cache["day"] != today:
+        _today_cache.update(day=today, str=today.strftime("%Y-%m-%d"))
+    return _today_cache["str"]
+
+
 async def create_po(
     supplier_id: Annotated[str, "ID of the user"],
     supplier_name: Annotated[str, "Name of the user"],
@@ -111,13 +106,13 @@ async def create_po(
 ) -> Dict[str, Any]:
     """Create a new purchase order"""
     # Generate purchase order ID
-    po_id = f"PO-{len(PO_DATABASE) + 1:03d}"
+    po_id = PO_REPOSITORY.next_id()
 
     # Calculate total
-    total = sum(item["quantity"] * item["price"] for item in items)
+    total = line_items_total(items)
 
     # Current date
-    today = datetime.now().strftime("%Y-%m-%d")
+    today = _today_str()
 
     # Create purchase order
     po = {
@@ -133,7 +128,7 @@ async def create_po(
     }
 
     # Add to database
-    PO_DATABASE[po_id] = po
+    PO_REPOSITORY.add(po)
 
     return {"success": True, "purchase_order": po}
 
@@ -143,15 +138,14 @@ async def close_po(
     invoice_id: Annotated[str, "ID of the invoice to link to this purchase order"],
 ) -> Dict[str, Any]:
     """Close a purchase order and link it to an invoice"""
-    if po_id not in PO_DATABASE:
+    po = PO_REPOSITORY.by_id(po_id)
+    if po is None:
         return {"error": f"Purchase Order {po_id} not found"}
 
-    po = PO_DATABASE[po_id]
     if po["status"] == "closed":
         return {"error": f"Purchase Order {po_id} is already closed"}
 
-    po["status"] = "closed"
-    po["invoice_id"] = invoice_id
+    PO_REPOSITORY.close(po_id, invoice_id)
 
     return {"success": True, "purchase_order": po}
 
@@ -201,6 +195,60 @@ transfer_back_to_orchestrator_tool = FunctionTool(
     description="Transfer the user back to the orchestrator agent for general inquiries",
 )
 
+# Tool lists shared by every PurchaseOrderAgent instance
+_TOOLS = [
+    fetch_po_tool,
+    fetch_user_pos_tool,
+    fetch_open_pos_tool,
+    create_po_tool,
+    close_po_tool,
+]
+
+_DELEGATE_TOOLS = [
+    transfer_to_invoice_agent_tool,
+    transfer_back_to_orchestrator_tool,
+]
+
+
+class PORepository:
+    """Purchase order store used by the PO tools, indexed by supplier and status"""
+
+    def __init__(self, purchase_orders: Dict[str, Dict[str, Any]]) -> None:
+        self._by_id = purchase_orders
+        self._by_supplier: DefaultDict[str, List[Dict[str, Any]]] = defaultdict(list)
+        # Open PO ids; a dict rather than a set so results keep creation order
+        self._open: Dict[str, None] = {}
+        for po in purchase_orders.values():
+            self._index(po)
+
+    def by_id(self, po_id: str) -> Optional[Dict[str, Any]]:
+        return self._by_id.get(po_id)
+
+    def by_supplier(self, supplier_id: str) -> List[Dict[str, Any]]:
+        return self._by_supplier.get(supplier_id, [])
+
+    def open(self) -> List[Dict[str, Any]]:
+        return [self._by_id[po_id] for po_id in self._open]
+
+    def next_id(self) -> str:
+        return f"PO-{len(self._by_id) + 1:03d}"
+
+    def add(self, po: Dict[str, Any]) -> None:
+        self._by_id[po["id"]] = po
+        self._index(po)
+
+    def close(self, po_id: str, invoice_id: str) -> None:
+        po = self._by_id[po_id]
+        po["status"] = "closed"
+        po["invoice_id"] = invoice_id
+        self._open.pop(po_id, None)
+
+    def _index(self, po: Dict[str, Any]) -> None:
+        self._by_supplier[po["supplier_id"]].append(po)
+        if po["status"] == "open":
+            self._open[po["id"]] = None
+
+
 # Mock purchase order data
 PO_DATABASE = {
     "PO-001": {
@@ -246,3 +294,5 @@ PO_DATABASE = {
         "invoice_id": None,
     },
 }
+
+PO_REPOSITORY = PORepository(PO_DATABASE)
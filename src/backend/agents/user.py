@@ -1,3 +1,4 @@
+from typing import Dict
 from autogen_core import (
     MessageContext,
     RoutedAgent,
@@ -11,12 +12,15 @@ class UserAgent(RoutedAgent):
     def __init__(self, description: str, agent_topic_type: str) -> None:
         super().__init__(description)
         self._agent_topic_type = agent_topic_type
+        # One UserAgent exists per session, so each route's TopicId never changes
+        self._topic_ids: Dict[str, TopicId] = {}
 
     @message_handler
     async def handle_session_message(
         self, message: Session, ctx: MessageContext
     ) -> None:
-        await self.publish_message(
-            message,
-            topic_id=TopicId(message.current_agent, source=self.id.key),
-        )
+        topic_id = self._topic_ids.get(message.current_agent)
+        if topic_id is None:
+            topic_id = TopicId(message.current_agent, source=self.id.key)
+            self._topic_ids[message.current_agent] = topic_id
+        await self.publish_message(message, topic_id=topic_id)
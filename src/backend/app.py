@@ -1,17 +1,24 @@
+import logging
 from contextlib import asynccontextmanager
+from importlib.util import find_spec
 from autogen_core import TopicId
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import uvicorn
 from autogen_core.models import UserMessage
-from runtime_init import RuntimeInit
+from config import LOG_LEVEL, USE_UVLOOP
+from runtime_init import RuntimeInit, USER_TOPIC
+from context.human_input import HumanInputBroker
 from context.session_manager import SessionManager
-from models.messages import UserRequest, SessionDetailResponse
+from models.messages import UserRequest, SessionDetailResponse, HumanReply
+
+logging.basicConfig(level=LOG_LEVEL)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global runtime, session_manager
+    global runtime, runtime_manager, session_manager
 
     print("Initializing agent runtime...")
     runtime_manager = await RuntimeInit.create()
@@ -24,11 +31,17 @@ async def lifespan(app: FastAPI):
     
     yield
     # Shutdown: Clean up resources
+    # Handlers waiting on a human reply would otherwise keep the runtime busy forever
+    HumanInputBroker.get_instance().cancel_all()
     await runtime.stop_when_idle()
     print("Shutting down...")
 
 
-app = FastAPI(lifespan=lifespan)
+# orjson is optional; serialize responses with it when it is installed
+app = FastAPI(
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if find_spec("orjson") else JSONResponse,
+)
 
 # Enable CORS
 app.add_middleware(
@@ -46,17 +59,18 @@ async def chat(request: UserRequest):
     if not request.session_id:
         session = session_manager.create_session()
     else:
-        session = session_manager.get_session(request.session_id)
+        session = await session_manager.get_session(request.session_id)
 
-    # Add user message to the session context
+    # Apply all changes in memory, then persist them with one write
     session.add_message(UserMessage(content=request.message, source="User"))
-    session_manager.update_status(session.id, "processing")
+    session.status = "processing"
+    await session_manager.save(session)
 
     # send a message to the user agent to process the request
     print(f"Publishing message to User agent for session {session.id}")
     await runtime.publish_message(
         session,
-        topic_id=TopicId("User", source=session.id),
+        topic_id=TopicId(USER_TOPIC, source=session.id),
     )
 
     return session.id
@@ -65,41 +79,50 @@ async def chat(request: UserRequest):
 @app.get("/sessions/{session_id}", response_model=SessionDetailResponse)
 async def get_session(session_id: str):
     """Get details for a specific session including messages"""
-    session = session_manager.get_session(session_id)
+    session = await session_manager.get_session(session_id)
     
     if not session:
         print(f"Session not found: {session_id}")
         raise HTTPException(status_code=404, detail="Session not found")
 
-    # Format messages for the response
-    formatted_messages = []
-    for msg in session.context:
-        content = msg.content if hasattr(msg, "content") else "No content"
-        source = msg.source if hasattr(msg, "source") else "System"
-
-        formatted_messages.append(
-            {
-                "content": content,
-                "source": source,
-                "role": "user" if source == "User" else "assistant",
-            }
-        )
-
-    print(f"Returning session {session_id} with {len(formatted_messages)} messages")
+    print(f"Returning session {session_id} with {len(session.context)} messages")
     return SessionDetailResponse(
         session_id=session.id,
         current_agent=session.current_agent,
         status=session.status,
-        messages=formatted_messages,
+        messages=session.context,
     )
 
 
+@app.post("/sessions/{session_id}/human-reply", response_model=str)
+async def human_reply(session_id: str, request: HumanReply):
+    """Deliver a human agent's reply to the session waiting on it"""
+    session = await session_manager.get_session(session_id)
+
+    if not session:
+        print(f"Session not found: {session_id}")
+        raise HTTPException(status_code=404, detail="Session not found")
+
+    if not HumanInputBroker.get_instance().submit_reply(session.id, request.message):
+        raise HTTPException(
+            status_code=409, detail="Session is not waiting for a human reply"
+        )
+    return session.id
+
+
 @app.get("/health")
 async def health_check():
-    """Check if the service is running"""
+    """Check if the service is running and can accept chat messages"""
+    try:
+        # /chat publishes to the user agent, so it must be registered
+        runtime_manager.get_agent_type(USER_TOPIC)
+    except KeyError:
+        raise HTTPException(status_code=503, detail="Agent runtime not ready")
     return {"status": "healthy"}
 
 
 if __name__ == "__main__":
     print("Starting 🤖 application")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(
+        app, host="0.0.0.0", port=8000, loop="uvloop" if USE_UVLOOP else "auto"
+    )
@@ -4,6 +4,15 @@ from dotenv import load_dotenv
 # Load environment variables from .env file if present
 load_dotenv()
 
+# Logging level for the application loggers (DEBUG shows agent/tool traces)
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+
+# Keep asyncio debug mode available to the agent runtime (off in production)
+ASYNCIO_DEBUG = os.environ.get("FIN_AGENTS_DEBUG", "0") == "1"
+
+# Run the server on uvloop (requires the uvloop package; not available on Windows)
+USE_UVLOOP = os.environ.get("FIN_AGENTS_USE_UVLOOP", "0") == "1"
+
 # Cosmos DB settings
 COSMOS_DB = {
     "endpoint": os.environ.get(
@@ -16,3 +25,8 @@ COSMOS_DB = {
     "database": os.environ.get("COSMOS_DATABASE", "agents_data"),
     "container": os.environ.get("COSMOS_CONTAINER", "sessions"),
 }
+
+# Azure OpenAI settings
+AZURE_OPENAI = {
+    "endpoint": os.environ.get("AZURE_OPENAI_ENDPOINT", ""),
+}
@@ -0,0 +1,46 @@
+import asyncio
+from typing import ClassVar, Dict, Optional
+
+
+class HumanInputBroker:
+    """Hands replies submitted through the API to the human agent waiting on a session"""
+
+    _instance: ClassVar[Optional["HumanInputBroker"]] = None
+
+    @classmethod
+    def get_instance(cls) -> "HumanInputBroker":
+        """Get or create the singleton instance of HumanInputBroker"""
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    def __init__(self) -> None:
+        # Only sessions with a human agent currently waiting have an entry
+        self._waiters: Dict[str, asyncio.Future] = {}
+
+    async def wait_for_reply(self, session_id: str) -> str:
+        """Wait without blocking the event loop until a reply arrives for the session"""
+        pending = self._waiters.get(session_id)
+        if pending is not None and not pending.done():
+            raise RuntimeError(f"Session {session_id} is already waiting for a reply")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[session_id] = waiter
+        try:
+            return await waiter
+        finally:
+            if self._waiters.get(session_id) is waiter:
+                del self._waiters[session_id]
+
+    def submit_reply(self, session_id: str, reply: str) -> bool:
+        """Deliver a human agent reply; returns False if nothing is waiting on the session"""
+        waiter = self._waiters.pop(session_id, None)
+        if waiter is None or waiter.done():
+            return False
+        waiter.set_result(reply)
+        return True
+
+    def cancel_all(self) -> None:
+        """Cancel every pending wait so human agent handlers can finish on shutdown"""
+        for waiter in self._waiters.values():
+            waiter.cancel()
+        self._waiters.clear()
@@ -1,28 +1,54 @@
-from typing import List, Optional, ClassVar
+import asyncio
+from collections import OrderedDict
+import logging
+import threading
+import time
+from typing import List, Optional, ClassVar, Tuple, Union
 from models.messages import Session
 from autogen_core.models import LLMMessage
 from datetime import datetime
 from azure.cosmos import CosmosClient
 from config import COSMOS_DB
 
+logger = logging.getLogger(__name__)
+
 
 class SessionManager:
+    """Session store backed by Cosmos DB; blocking SDK calls run off the event loop"""
+
     _instance: ClassVar[Optional["SessionManager"]] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    # Upper bound on sessions kept in the in-process cache
+    _cache_max_sessions: ClassVar[int] = 1024
+    # Cached sessions older than this are re-read, so other workers' writes show up
+    _cache_ttl_seconds: ClassVar[float] = 2.0
 
     @classmethod
     def get_instance(cls, default_max_messages: int = 20) -> "SessionManager":
         """Get or create the singleton instance of SessionManager"""
+        return cls(default_max_messages)
+
+    def __new__(cls, *args, **kwargs) -> "SessionManager":
         if cls._instance is None:
-            cls._instance = cls(default_max_messages)
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
         return cls._instance
 
     def __init__(self, default_max_messages: int = 20) -> None:
-        # Only initialize if this is not a duplicate instance
-        if self.__class__._instance is not None:
-            print("SessionManager instance already exists. Use get_instance() instead.")
-            return
-
-        self.default_max_messages = default_max_messages
+        # __new__ always returns the shared instance; only the first call sets it up
+        with self._lock:
+            if getattr(self, "_initialized", False):
+                return
+            self.default_max_messages = default_max_messages
+            # Sessions this process recently read or wrote, with the time they were
+            # cached; most recently used last
+            self._cache: OrderedDict[str, Tuple[float, Session]] = OrderedDict()
+            self._connect()
+            self._initialized = True
+
+    def _connect(self) -> None:
+        """Create the Cosmos DB client for the configured container"""
         cosmos_endpoint = COSMOS_DB["endpoint"]
         cosmos_key = COSMOS_DB["key"]
         database_name = COSMOS_DB["database"]
@@ -35,91 +61,170 @@ class SessionManager:
             self.client = CosmosClient(cosmos_endpoint, cosmos_key)
             self.database = self.client.get_database_client(database_name)
             self.container = self.database.get_container_client(container_name)
-            print(f"Connected printB container: {container_name}")
+            print(f"Connected to Cosmos DB container: {container_name}")
         except Exception as e:
             print(f"Failed to connect to Cosmos DB: {str(e)}")
 
     def create_session(self, current_agent: str = "OrchestratorAgent") -> Session:
-        """Create a new session and save to Cosmos DB."""
+        """Create a new session; it is written to Cosmos DB by the first save()"""
         session = Session(
             current_agent=current_agent, max_messages=self.default_max_messages
         )
+        return self._cache_session(session)
+
+    async def save(self, session: Session) -> bool:
+        """Create or replace a session in Cosmos DB with a single upsert"""
+        self._cache_session(session)
         try:
             session_data = session.model_dump()
-            self.container.create_item(body=session_data)
-            print(f"Session created in Cosmos DB: {session.id}")
+            await asyncio.to_thread(self.container.upsert_item, body=session_data)
+            logger.debug("Saved session in Cosmos DB: %s", session.id)
+            return True
         except Exception as e:
-            print(f"Failed to create session: {str(e)}")
-
-        return session
+            print(f"Failed to save session {session.id}: {str(e)}")
+            self.invalidate(session.id)
+            return False
 
-    def get_session(self, session_id: str) -> Optional[Session]:
+    async def get_session(self, session_id: str) -> Optional[Session]:
         """Get a session by ID from Cosmos DB"""
-        print(f"Getting session {session_id} from Cosmos DB")
+        logger.debug("Getting session %s", session_id)
         if not session_id:
             return None
+        session = self._cached(session_id)
+        if session is not None:
+            return session
         try:
-            item = self.container.read_item(item=session_id, partition_key=session_id)
-            print(f"Session {session_id} found in Cosmos DB")
-            print(item)
-            return Session(**item)
+            item = await asyncio.to_thread(
+                self.container.read_item, item=session_id, partition_key=session_id
+            )
+            logger.debug("Session %s found in Cosmos DB", session_id)
+            return self._cache_session(Session(**item))
         except Exception as e:
-            print(f"Session {session_id} not found: {str(e)}")
+            logger.debug("Session %s not found: %s", session_id, e)
             return None
 
-    def update_current_agent(self, session_id: str, agent_type: str) -> bool:
-        """Update the current agent for a session"""
+    async def get_many(self, session_ids: List[str]) -> List[Session]:
+        """Get several sessions, reading the uncached ones in a single query"""
+        sessions = {}
+        for session_id in session_ids:
+            session = self._cached(session_id)
+            if session is not None:
+                sessions[session_id] = session
+        missing = [
+            session_id for session_id in session_ids if session_id not in sessions
+        ]
+        if missing:
+            try:
+                items = await asyncio.to_thread(
+                    lambda: list(
+                        self.container.query_items(
+                            query="SELECT * FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+                            parameters=[{"name": "@ids", "value": missing}],
+                            enable_cross_partition_query=True,
+                        )
+                    )
+                )
+                for item in items:
+                    sessions[item["id"]] = self._cache_session(Session(**item))
+            except Exception as e:
+                print(f"Failed to query sessions: {str(e)}")
+
+        return [
+            sessions[session_id] for session_id in session_ids if session_id in sessions
+        ]
+
+    async def update_current_agent(
+        self, session_or_id: Union[Session, str], agent_type: str
+    ) -> bool:
+        """Update the current agent for a session, given the session or its ID"""
+        session_id = getattr(session_or_id, "id", session_or_id)
         try:
-            session = self.get_session(session_id)
+            session = await self._resolve(session_or_id)
             if not session:
                 return False
 
             session.current_agent = agent_type
 
             # Update in Cosmos DB
-            return self._update_session(session)
+            return await self._update_session(session)
         except Exception as e:
             print(f"Error updating agent for session {session_id}: {str(e)}")
             return False
 
-    def get_messages(self, session_id: str) -> List[LLMMessage]:
+    async def get_messages(self, session_id: str) -> List[LLMMessage]:
         """Get messages for a session"""
-        session = self.get_session(session_id)
+        session = await self.get_session(session_id)
         if not session:
             return []
 
         return session.get_context_as_llm_messages()
 
-    def update_status(self, session_id: str, status: str) -> bool:
-        """Update the status of a session"""
+    async def update_status(self, session_or_id: Union[Session, str], status: str) -> bool:
+        """Update the status of a session, given the session or its ID"""
+        session_id = getattr(session_or_id, "id", session_or_id)
         try:
-            session = self.get_session(session_id)
+            session = await self._resolve(session_or_id)
             if not session:
                 print(f"Cannot update status - session not found: {session_id}")
                 return False
 
             session.status = status
             # Update in Cosmos DB
-            return self._update_session(session)
+            return await self._update_session(session)
         except Exception as e:
             print(f"Error updating status for session {session_id}: {str(e)}")
             return False
 
-    def get_status(self, session_id: str) -> Optional[str]:
+    async def get_status(self, session_id: str) -> Optional[str]:
         """Get the status of a session"""
-        session = self.get_session(session_id)
+        session = await self.get_session(session_id)
         if not session:
             return None
 
         return session.status
 
-    def _update_session(self, session: Session) -> bool:
+    async def _resolve(self, session_or_id: Union[Session, str]) -> Optional[Session]:
+        """Use a Session the caller already holds; only look up bare IDs"""
+        if isinstance(session_or_id, Session):
+            return session_or_id
+        return await self.get_session(session_or_id)
+
+    async def _update_session(self, session: Session) -> bool:
         """Update an existing session in Cosmos DB"""
+        self._cache_session(session)
         try:
             session_data = session.model_dump()
-            self.container.replace_item(item=session.id, body=session_data)
-            print(f"Updated session in Cosmos DB: {session.id}")
+            await asyncio.to_thread(
+                self.container.replace_item, item=session.id, body=session_data
+            )
+            logger.debug("Updated session in Cosmos DB: %s", session.id)
             return True
         except Exception as e:
             print(f"Error updating session in Cosmos DB {session.id}: {str(e)}")
+            self.invalidate(session.id)
             return False
+
+    def invalidate(self, session_id: str) -> None:
+        """Drop a cached session so the next read goes to Cosmos DB"""
+        self._cache.pop(session_id, None)
+
+    def _cached(self, session_id: str) -> Optional[Session]:
+        """Return a cached session that is still fresh, or None"""
+        entry = self._cache.get(session_id)
+        if entry is None:
+            return None
+        cached_at, session = entry
+        if time.monotonic() - cached_at > self._cache_ttl_seconds:
+            del self._cache[session_id]
+            return None
+        self._cache.move_to_end(session_id)
+        # Hand out a copy; the caller may mutate it while a handler owns another
+        return session.model_copy(deep=True)
+
+    def _cache_session(self, session: Session) -> Session:
+        """Store a snapshot of a session so reads shortly after skip Cosmos DB"""
+        self._cache[session.id] = (time.monotonic(), session.model_copy(deep=True))
+        self._cache.move_to_end(session.id)
+        if len(self._cache) > self._cache_max_sessions:
+            self._cache.popitem(last=False)
+        return session
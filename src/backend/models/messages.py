@@ -1,6 +1,6 @@
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 import uuid
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from autogen_core.models import (
     LLMMessage,
     UserMessage,
@@ -10,6 +10,11 @@ from autogen_core.models import (
 )
 
 
+# Rough tokenizer-free estimate, good enough to keep prompts under budget
+_CHARS_PER_TOKEN = 4
+_TRUNCATED_SUFFIX = "\n...[truncated]"
+
+
 class SerializableMessage(BaseModel):
     type: str
     content: Any
@@ -19,22 +24,29 @@ class SerializableMessage(BaseModel):
     @classmethod
     def from_llm_message(cls, msg: LLMMessage) -> "SerializableMessage":
         msg_type = type(msg).__name__
-        content = msg.content if hasattr(msg, "content") else ""
+        content = getattr(msg, "content", "")
         source = getattr(msg, "source", "System")
         role = "user" if source == "User" else "assistant"
         return cls(type=msg_type, content=content, source=source, role=role)
 
     def to_llm_message(self) -> LLMMessage:
-        if self.type == "UserMessage":
-            return UserMessage(content=self.content, source=self.source)
-        elif self.type == "AssistantMessage":
-            return AssistantMessage(content=self.content, source=self.source)
-        elif self.type == "SystemMessage":
-            return SystemMessage(content=self.content)
-        elif self.type == "FunctionExecutionResultMessage":
-            return FunctionExecutionResultMessage(content=self.content)
-        else:
+        to_llm = _TO_LLM.get(self.type)
+        if to_llm is None:
             return LLMMessage(content=self.content, source=self.source)
+        return to_llm(self)
+
+
+# Serialized type name -> LLM message constructor
+_TO_LLM: Dict[str, Callable[[SerializableMessage], LLMMessage]] = {
+    "UserMessage": lambda msg: UserMessage(content=msg.content, source=msg.source),
+    "AssistantMessage": lambda msg: AssistantMessage(
+        content=msg.content, source=msg.source
+    ),
+    "SystemMessage": lambda msg: SystemMessage(content=msg.content),
+    "FunctionExecutionResultMessage": lambda msg: FunctionExecutionResultMessage(
+        content=msg.content
+    ),
+}
 
 
 class Session(BaseModel):
@@ -42,16 +54,85 @@ class Session(BaseModel):
     current_agent: str
     context: List[SerializableMessage] = []
     max_messages: int
+    max_tokens: int = 8000
     status: str = "idle"  # Values: "idle", "processing", "complete"
+    # Running token estimate for context; None until first counted
+    _token_count: Optional[int] = PrivateAttr(default=None)
+    # LLM-side mirror of context, built once and then kept in step with it
+    _llm_messages: Optional[List[LLMMessage]] = PrivateAttr(default=None)
 
     def add_message(self, message: LLMMessage) -> None:
+        if isinstance(message, FunctionExecutionResultMessage):
+            # One huge tool output must not be able to evict the whole conversation
+            message = _truncate_results(message, self.max_tokens // 2 * _CHARS_PER_TOKEN)
         serializable_msg = SerializableMessage.from_llm_message(message)
         self.context.append(serializable_msg)
-        if len(self.context) > self.max_messages:
-            self.context = self.context[-self.max_messages :]
+        if self._llm_messages is not None:
+            self._llm_messages.append(message)
+        if self._token_count is not None:
+            self._token_count += _estimate_tokens(serializable_msg)
+        self._trim_context()
+
+    def _trim_context(self) -> None:
+        """Evict the oldest messages until the context fits max_messages and max_tokens"""
+        if self._token_count is None:
+            self._token_count = sum(_estimate_tokens(msg) for msg in self.context)
+
+        # Never evict the latest user turn or the tool calls and results answering it
+        keep_from = next(
+            (
+                i
+                for i in range(len(self.context) - 1, -1, -1)
+                if self.context[i].type == "UserMessage"
+            ),
+            len(self.context) - 1,
+        )
+        drop = 0
+        while drop < keep_from and (
+            len(self.context) - drop > self.max_messages
+            or self._token_count > self.max_tokens
+        ):
+            self._token_count -= _estimate_tokens(self.context[drop])
+            drop += 1
+        # A tool result must not lead the context without the call that produced it
+        while (
+            drop < len(self.context)
+            and self.context[drop].type == "FunctionExecutionResultMessage"
+        ):
+            self._token_count -= _estimate_tokens(self.context[drop])
+            drop += 1
+        if drop:
+            del self.context[:drop]
+            if self._llm_messages is not None:
+                del self._llm_messages[:drop]
 
     def get_context_as_llm_messages(self) -> List[LLMMessage]:
-        return [msg.to_llm_message() for msg in self.context]
+        if self._llm_messages is None:
+            self._llm_messages = [msg.to_llm_message() for msg in self.context]
+        return list(self._llm_messages)
+
+
+def _estimate_tokens(msg: SerializableMessage) -> int:
+    return len(str(msg.content)) // _CHARS_PER_TOKEN + 1
+
+
+def _truncate_results(
+    message: FunctionExecutionResultMessage, max_chars: int
+) -> FunctionExecutionResultMessage:
+    """Cut tool outputs down so together they fit in max_chars"""
+    if sum(len(result.content) for result in message.content) <= max_chars:
+        return message
+    per_result = max_chars // len(message.content)
+    return FunctionExecutionResultMessage(
+        content=[
+            result.model_copy(
+                update={"content": result.content[:per_result] + _TRUNCATED_SUFFIX}
+            )
+            if len(result.content) > per_result
+            else result
+            for result in message.content
+        ]
+    )
 
 
 # API models
@@ -60,8 +141,12 @@ class UserRequest(BaseModel):
     session_id: Optional[str] = None
 
 
+class HumanReply(BaseModel):
+    message: str
+
+
 class SessionDetailResponse(BaseModel):
     session_id: str
     current_agent: str
     status: str
-    messages: List[Dict] = []
+    messages: List[SerializableMessage] = []
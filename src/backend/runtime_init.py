@@ -1,4 +1,8 @@
+import asyncio
+import logging
+import os
 from autogen_core import (
+    AgentType,
     SingleThreadedAgentRuntime,
     TypeSubscription,
 )
@@ -9,23 +13,119 @@ from agents.human import HumanAgent
 from agents.user import UserAgent
 from autogen_ext.models.openai import AzureOpenAIChatCompletionClient
 from azure.identity import AzureCliCredential, get_bearer_token_provider
+from config import ASYNCIO_DEBUG, AZURE_OPENAI
+from context.human_input import HumanInputBroker
 from context.session_manager import SessionManager
 
+logger = logging.getLogger(__name__)
+
+# Topic types, one per agent; the same string objects are used for every
+# subscription and publish
+ORCHESTRATOR_TOPIC = "OrchestratorAgent"
+INVOICE_TOPIC = "InvoiceAgent"
+PO_TOPIC = "PurchaseOrderAgent"
+HUMAN_TOPIC = "HumanAgent"
+USER_TOPIC = "User"
+
+
+class _UninitializedRuntime:
+    """Placeholder runtime that raises on any use until create() has run"""
+
+    def __getattr__(self, name):
+        raise RuntimeError("Runtime not initialized. Call create() first.")
+
+
+_UNINITIALIZED = _UninitializedRuntime()
+
+
+def _bind_factory(agent_cls, **kwargs):
+    """Build a zero-argument agent factory with its constructor arguments bound once"""
+    # The runtime only accepts factories taking 0 or 2 parameters, which rules out
+    # functools.partial (its signature still lists the bound keywords)
+    return lambda: agent_cls(**kwargs)
+
+
+def _token_warmup_done(task):
+    """Forget a finished token warm-up task and log why it failed, if it did"""
+    RuntimeInit._background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Bearer token warm-up failed: %s", task.exception())
+
 
 class RuntimeInit:
-    # Define topic types as class attributes
-    ORCHESTRATOR_TOPIC = "OrchestratorAgent"
-    INVOICE_TOPIC = "InvoiceAgent"
-    PO_TOPIC = "PurchaseOrderAgent"
-    HUMAN_TOPIC = "HumanAgent"
-    USER_TOPIC = "User"
+    __slots__ = (
+        "runtime",
+        "model_client",
+        "token_provider",
+        "session_manager",
+        "_agent_types",
+    )
+
+    # Expose the topic types as class attributes too
+    ORCHESTRATOR_TOPIC = ORCHESTRATOR_TOPIC
+    INVOICE_TOPIC = INVOICE_TOPIC
+    PO_TOPIC = PO_TOPIC
+    HUMAN_TOPIC = HUMAN_TOPIC
+    USER_TOPIC = USER_TOPIC
+
+    # (agent class, topic type, constructor kwargs, shared dependencies to inject)
+    _AGENT_SPECS = (
+        (
+            OrchestratorAgent,
+            ORCHESTRATOR_TOPIC,
+            {"agent_topic_type": ORCHESTRATOR_TOPIC, "user_topic_type": USER_TOPIC},
+            ("model_client", "sessionManager"),
+        ),
+        (
+            InvoiceAgent,
+            INVOICE_TOPIC,
+            {"agent_topic_type": INVOICE_TOPIC, "user_topic_type": USER_TOPIC},
+            ("model_client", "sessionManager"),
+        ),
+        (
+            PurchaseOrderAgent,
+            PO_TOPIC,
+            {"agent_topic_type": PO_TOPIC, "user_topic_type": USER_TOPIC},
+            ("model_client", "sessionManager"),
+        ),
+        (
+            HumanAgent,
+            HUMAN_TOPIC,
+            {
+                "description": "A human agent that handles complex user inquiries",
+                "agent_topic_type": HUMAN_TOPIC,
+                "user_topic_type": USER_TOPIC,
+            },
+            ("sessionManager", "humanInputBroker"),
+        ),
+        (
+            UserAgent,
+            USER_TOPIC,
+            {
+                "description": "A user agent that handles user interactions",
+                # start with orchestrator agent
+                "agent_topic_type": ORCHESTRATOR_TOPIC,
+            },
+            (),
+        ),
+    )
+
+    # Token providers and model clients shared across runtimes, keyed by
+    # (model, deployment, api_version, endpoint)
+    _client_cache: dict[tuple, tuple] = {}
+    _client_cache_max_entries = 4
+    # Keeps background tasks referenced until they finish
+    _background_tasks = set()
+    # Process-wide SessionManager, fetched on the first create()
+    _session_manager = None
 
     def __init__(self):
         """Standard constructor (non-async)"""
-        self.runtime = None
+        self.runtime = _UNINITIALIZED
         self.model_client = None
         self.token_provider = None
-        self.initialized = False
+        self.session_manager = None
+        self._agent_types: dict[str, AgentType] = {}
 
     @classmethod
     async def create(cls):
@@ -34,124 +134,108 @@ class RuntimeInit:
         await instance._initialize()
         return instance
 
+    @classmethod
+    def invalidate_clients(cls):
+        """Forget cached model clients, e.g. after rotating credentials"""
+        cls._client_cache.clear()
+
     async def _initialize(self):
         """Internal method to initialize the runtime and agents"""
+        # Fail before building anything if the model client could never connect
+        endpoint = AZURE_OPENAI["endpoint"]
+        if not endpoint:
+            raise RuntimeError("AZURE_OPENAI_ENDPOINT must be set")
+
+        loop = asyncio.get_running_loop()
+        if not ASYNCIO_DEBUG:
+            # Debug mode captures a traceback for every scheduled callback
+            if os.environ.get("PYTHONASYNCIODEBUG"):
+                logger.warning(
+                    "PYTHONASYNCIODEBUG is set; disabling asyncio debug mode for the "
+                    "agent runtime. Set FIN_AGENTS_DEBUG=1 to keep it."
+                )
+            loop.set_debug(False)
+
         # Create runtime
         self.runtime = SingleThreadedAgentRuntime()
 
-        self.session_manager = SessionManager.get_instance()
-
-        # Set up the model client
-        try:
-            self.token_provider = get_bearer_token_provider(
-                AzureCliCredential(), "https://cognitiveservices.azure.com/.default"
-            )
-            self.model_client = AzureOpenAIChatCompletionClient(
-                model="o3-mini",
-                azure_deployment="o3-mini",
-                api_version="2024-12-01-preview",
-                azure_ad_token_provider=self.token_provider,
-                azure_endpoint="",
-            )
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize the model client: {str(e)}")
-
-        # Register the orchestrator agent
-        orchestrator_agent_type = await OrchestratorAgent.register(
-            self.runtime,
-            type=self.ORCHESTRATOR_TOPIC,
-            factory=lambda: OrchestratorAgent(
-                model_client=self.model_client,
-                agent_topic_type=self.ORCHESTRATOR_TOPIC,
-                user_topic_type=self.USER_TOPIC,
-                sessionManager=self.session_manager,
-            ),
-        )
-        await self.runtime.add_subscription(
-            TypeSubscription(
-                topic_type=self.ORCHESTRATOR_TOPIC,
-                agent_type=orchestrator_agent_type.type,
-            )
-        )
-
-        # Register the invoice agent
-        invoice_agent_type = await InvoiceAgent.register(
-            self.runtime,
-            type=self.INVOICE_TOPIC,
-            factory=lambda: InvoiceAgent(
-                model_client=self.model_client,
-                user_topic_type=self.USER_TOPIC,
-                agent_topic_type=self.INVOICE_TOPIC,
-                sessionManager=self.session_manager,
-            ),
-        )
-        await self.runtime.add_subscription(
-            TypeSubscription(
-                topic_type=self.INVOICE_TOPIC, agent_type=invoice_agent_type.type
-            )
-        )
-
-        # Register the purchase order agent
-        po_agent_type = await PurchaseOrderAgent.register(
-            self.runtime,
-            type=self.PO_TOPIC,
-            factory=lambda: PurchaseOrderAgent(
-                model_client=self.model_client,
-                agent_topic_type=self.PO_TOPIC,
-                user_topic_type=self.USER_TOPIC,
-                sessionManager=self.session_manager,
-            ),
-        )
-        await self.runtime.add_subscription(
-            TypeSubscription(topic_type=self.PO_TOPIC, agent_type=po_agent_type.type)
-        )
-
-        # Register the human agent
-        human_agent_type = await HumanAgent.register(
-            self.runtime,
-            type=self.HUMAN_TOPIC,
-            factory=lambda: HumanAgent(
-                description="A human agent that handles complex user inquiries",
-                agent_topic_type=self.HUMAN_TOPIC,
-                user_topic_type=self.USER_TOPIC,
-                sessionManager=self.session_manager,
-            ),
-        )
-        await self.runtime.add_subscription(
-            TypeSubscription(
-                topic_type=self.HUMAN_TOPIC, agent_type=human_agent_type.type
+        if RuntimeInit._session_manager is None:
+            RuntimeInit._session_manager = SessionManager.get_instance()
+        self.session_manager = RuntimeInit._session_manager
+
+        # Set up the model client, reusing one built by an earlier runtime
+        model = deployment = "o3-mini"
+        api_version = "2024-12-01-preview"
+        key = (model, deployment, api_version, endpoint)
+        cached = RuntimeInit._client_cache.get(key)
+        if cached is not None:
+            self.token_provider, self.model_client = cached
+        else:
+            try:
+                self.token_provider = get_bearer_token_provider(
+                    AzureCliCredential(), "https://cognitiveservices.azure.com/.default"
+                )
+                self.model_client = AzureOpenAIChatCompletionClient(
+                    model=model,
+                    azure_deployment=deployment,
+                    api_version=api_version,
+                    azure_ad_token_provider=self.token_provider,
+                    azure_endpoint=endpoint,
+                )
+            except Exception as e:
+                raise RuntimeError(f"Failed to initialize the model client: {str(e)}")
+            if len(RuntimeInit._client_cache) >= RuntimeInit._client_cache_max_entries:
+                # Drop the oldest entry; dicts keep insertion order
+                del RuntimeInit._client_cache[next(iter(RuntimeInit._client_cache))]
+            RuntimeInit._client_cache[key] = (self.token_provider, self.model_client)
+            # Fetch the first token (an az CLI subprocess) while the agents register;
+            # the provider caches it for the model client's first request
+            warmup = asyncio.create_task(asyncio.to_thread(self.token_provider))
+            RuntimeInit._background_tasks.add(warmup)
+            warmup.add_done_callback(_token_warmup_done)
+
+        # Shared dependencies that spec rows can ask for by constructor argument name
+        dependencies = {
+            "model_client": self.model_client,
+            "sessionManager": self.session_manager,
+            "humanInputBroker": HumanInputBroker.get_instance(),
+        }
+        # Registrations are independent of each other, so run them concurrently
+        await asyncio.gather(
+            *(
+                self._register_agent(
+                    agent_cls,
+                    topic_type,
+                    _bind_factory(
+                        agent_cls,
+                        **kwargs,
+                        **{name: dependencies[name] for name in needs},
+                    ),
+                )
+                for agent_cls, topic_type, kwargs, needs in self._AGENT_SPECS
             )
         )
 
-        # Register the user agent
-        user_agent_type = await UserAgent.register(
-            self.runtime,
-            type=self.USER_TOPIC,
-            factory=lambda: UserAgent(
-                description="A user agent that handles user interactions",
-                # start with orchestrator agent
-                agent_topic_type=self.ORCHESTRATOR_TOPIC,
-            ),
+    async def _register_agent(self, agent_cls, topic_type, factory):
+        """Register an agent type and subscribe it to its topic"""
+        agent_type = await agent_cls.register(
+            self.runtime, type=topic_type, factory=factory
         )
+        self._agent_types[topic_type] = agent_type
         await self.runtime.add_subscription(
-            TypeSubscription(
-                topic_type=self.USER_TOPIC, agent_type=user_agent_type.type
-            )
+            TypeSubscription(topic_type=topic_type, agent_type=agent_type.type)
         )
-
-        self.initialized = True
+        return agent_type
 
     def start(self):
         """Start the runtime"""
-        if not self.initialized:
-            raise RuntimeError("Runtime not initialized. Call create() first.")
-
         self.runtime.start()
         return self.runtime
 
+    def get_agent_type(self, topic_type: str) -> AgentType:
+        """Get the registered agent type for a topic type"""
+        return self._agent_types[topic_type]
+
     def get_runtime(self):
         """Get the initialized runtime"""
-        if not self.initialized:
-            raise RuntimeError("Runtime not initialized. Call create() first.")
-
         return self.runtime